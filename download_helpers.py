@@ -0,0 +1,117 @@
+import asyncio
+import os
+import requests
+from tempfile import NamedTemporaryFile
+from minio.error import S3Error
+from minio_client import upload_to_minio
+
+CHUNK_SIZE = 64 * 1024  # Stream downloads in 64 KB chunks
+MAX_PDF_BYTES = 500 * 1024 * 1024  # Abort anything larger than 500 MB
+
+def check_pdf_head(head):
+    """Return why the first bytes of a download are not a PDF, or None if they look like one."""
+    if b"%PDF-" in head[:1024]:
+        return None
+    if b"<html" in head.lower():
+        return "got an HTML page instead of a PDF"
+    return "missing %PDF- header"
+
+def check_content_length(headers):
+    """Return why a response is too large to download, or None if it is within the cap."""
+    length = headers.get("Content-Length")
+    if length is not None and length.isdigit() and int(length) > MAX_PDF_BYTES:
+        return f"Content-Length {length} exceeds {MAX_PDF_BYTES} bytes"
+    return None
+
+def reject(url, reason):
+    """Report a failed download or upload."""
+    print(f"❌ Download failed for {url}: {reason}")
+    return None
+
+def stream_pdf(session, url, f):
+    """Stream a PDF into the open file `f` through a shared session; returns True once fully written."""
+    try:
+        with session.get(url, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            error = check_content_length(response.headers)
+            if error:
+                return reject(url, error)
+
+            # iter_content wraps urllib3 read errors as requests exceptions and reads to the real EOF
+            chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+            head = next(chunks, b"")
+            error = check_pdf_head(head)
+            if error:
+                return reject(url, error)
+
+            total_bytes = f.write(head)
+            for chunk in chunks:
+                total_bytes += f.write(chunk)
+                if total_bytes > MAX_PDF_BYTES:
+                    return reject(url, f"body exceeds {MAX_PDF_BYTES} bytes")
+    except requests.RequestException as e:
+        return reject(url, e)
+    return True
+
+async def stream_pdf_async(session, url, f):
+    """Same as `stream_pdf`, for an aiohttp session so the event loop is never blocked."""
+    import aiohttp  # Only the async end-to-end test needs aiohttp
+
+    try:
+        async with session.get(url) as response:
+            if response.status != 200:
+                return reject(url, f"HTTP {response.status}")
+            error = check_content_length(response.headers)
+            if error:
+                return reject(url, error)
+
+            try:
+                head = await response.content.readexactly(CHUNK_SIZE)
+            except asyncio.IncompleteReadError as e:
+                head = e.partial
+            error = check_pdf_head(head)
+            if error:
+                return reject(url, error)
+
+            total_bytes = f.write(head)
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                total_bytes += f.write(chunk)
+                if total_bytes > MAX_PDF_BYTES:
+                    return reject(url, f"body exceeds {MAX_PDF_BYTES} bytes")
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        return reject(url, e)
+    return True
+
+def upload_pdf(url, pdf_filename, bucket, key):
+    """Upload with the application's `upload_to_minio` and return the path it reports, or None."""
+    try:
+        minio_url = upload_to_minio(pdf_filename, bucket, key)
+    except (S3Error, OSError) as e:
+        return reject(url, e)
+    if minio_url is None:
+        return reject(url, "upload_to_minio returned no path")
+    return minio_url
+
+def download_and_upload(session, url, bucket, key):
+    """Download a validated PDF to a temporary file and upload it; returns the MinIO path or None."""
+    # Not a direct stream into put_object: upload_to_minio takes a file path and defines the
+    # minio_path format, so the PDF makes one write and one read through the temp dir
+    tmp = NamedTemporaryFile(suffix=".pdf", delete=False)
+    try:
+        with tmp:
+            downloaded = stream_pdf(session, url, tmp)
+        return upload_pdf(url, tmp.name, bucket, key) if downloaded else None
+    finally:
+        os.remove(tmp.name)
+
+async def download_and_upload_async(session, url, bucket, key):
+    """Same as `download_and_upload`, for an aiohttp session; the blocking upload runs in a thread."""
+    tmp = NamedTemporaryFile(suffix=".pdf", delete=False)
+    try:
+        with tmp:
+            downloaded = await stream_pdf_async(session, url, tmp)
+        if not downloaded:
+            return None
+        return await asyncio.to_thread(upload_pdf, url, tmp.name, bucket, key)
+    finally:
+        os.remove(tmp.name)
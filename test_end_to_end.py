@@ -1,96 +1,94 @@
 import pytest
-import psycopg2
-import random
+import asyncio
+import aiohttp
+import importlib.util
 import os
 import sys
-import subprocess
-from config import DB_CONFIG
-from scraper import google_search_pdf
-from minio_client import download_pdf, upload_to_minio, update_minio_path
+from psycopg2.extras import execute_values
+from download_helpers import download_and_upload_async
 
 # Add project root to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../modules/csr_scraper")))
 
-def test_end_to_end():
-    """Full end-to-end test: Scrape → Store → Download → Upload to MinIO → Update DB"""
+async def pipeline_one(search, session, semaphore, symbol, company_name, year):
+    """Scrape, download and upload one company's report; returns the row to write back."""
+    async with semaphore:
+        # Scrape the report URL
+        url = await asyncio.to_thread(search, company_name, year)
+        if url is None:
+            print(f"⚠️ Scraper did not find a report for {company_name} ({year}).")
+            return None
+
+        # Download the PDF and upload it to MinIO
+        minio_url = await download_and_upload_async(session, url, "csreport", f"{symbol}_{year}.pdf")
+        if minio_url is None:
+            print(f"⚠️ Failed to download PDF for {company_name} ({year}), skipping MinIO upload.")
+        return (url, minio_url, symbol, year)
+
+@pytest.mark.skipif(importlib.util.find_spec("pytest_asyncio") is None, reason="⚠️ pytest-asyncio is required for the async end-to-end test.")
+@pytest.mark.asyncio
+@pytest.mark.parametrize("n_companies", [8])
+async def test_end_to_end(db_conn, cached_google_search, sample_reports, n_companies):
+    """Full end-to-end test: Scrape → Download → Upload to MinIO → Update DB, for N companies at once"""
     
-    conn = psycopg2.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-
-    # 1️⃣ Select a random company from the database that needs a CSR report
-    cursor.execute("""
-        SELECT symbol, company_name FROM Ginkgo.csr_reports 
-        WHERE report_url IS NULL 
-        ORDER BY RANDOM() 
-        LIMIT 1;
-    """)
-    company = cursor.fetchone()
-
-    if not company:
-        pytest.skip("⚠️ No available companies without report_url in the database.")
-
-    symbol, company_name = company
-    year = random.randint(2014, 2024)  # ✅ 修正年份范围
-
-    # 2️⃣ Scrape the report URL
-    url = google_search_pdf(company_name, year)
-    if url is None:
-        pytest.skip(f"⚠️ Scraper did not find a report for {company_name} ({year}).")
-
-    # 3️⃣ Update the database with the scraped URL
-    cursor.execute("""
-        UPDATE Ginkgo.csr_reports 
-        SET report_url = %s 
-        WHERE symbol = %s AND report_year = %s;
-    """, (url, symbol, year))
-    conn.commit()
-
-    # 4️⃣ Download the PDF
-    pdf_filename = f"{symbol}_{year}.pdf"
-    success = download_pdf(url, pdf_filename)
-    if not success:
-        pytest.skip(f"⚠️ Failed to download PDF for {company_name} ({year}), skipping MinIO upload.")
-
-    # 5️⃣ Upload the PDF to MinIO
-    minio_url = upload_to_minio(pdf_filename, "csreport", pdf_filename)
-    assert minio_url is not None, "❌ MinIO upload failed."
-
-    # 6️⃣ Update the database with MinIO storage path
-    update_minio_path(symbol, year, minio_url)
-
-    # 7️⃣ Verify that MinIO path is correctly stored in the database
-    cursor.execute("""
-        SELECT minio_path FROM Ginkgo.csr_reports 
-        WHERE symbol = %s AND report_year = %s;
-    """, (symbol, year))
-    result = cursor.fetchone()
-    
-    assert result is not None and result[0] == minio_url, "❌ Database MinIO path update failed."
+    cursor = db_conn.cursor()
 
-    # 8️⃣ Cleanup test PDF file
-    os.remove(pdf_filename)
-
-    cursor.close()
-    conn.close()
+    # 1️⃣ Select and lock random report rows that need a CSR report, skipping rows other workers hold.
+    # Each (symbol, report_year) is the primary key, so the locked rows never share a row or MinIO key.
+    companies = sample_reports(cursor, ["symbol", "company_name", "report_year"], "report_url IS NULL", n_companies)
 
-    print(f"✅ End-to-end test PASSED for {company_name} ({year}).")
+    if not companies:
+        pytest.skip("⚠️ No available companies without report_url in the database.")
 
-def test_code_quality():
-    """Run linting, formatting, and security scans for minio_client.py only."""
-    python_exec = sys.executable
+    # 2️⃣ Run scrape → download → upload concurrently, at most 8 companies in flight
+    semaphore = asyncio.Semaphore(8)
+    async with aiohttp.ClientSession() as session:
+        results = await asyncio.gather(*[
+            pipeline_one(cached_google_search, session, semaphore, symbol, company_name, year)
+            for symbol, company_name, year in companies
+        ], return_exceptions=True)
+
+    # One company's error must not discard the others' results; report each failure instead
+    failures = []
+    for (symbol, company_name, year), result in zip(companies, results):
+        if isinstance(result, Exception):
+            print(f"❌ Pipeline failed for {company_name} ({year}): {result!r}")
+            failures.append(f"{symbol} ({year}): {result!r}")
+    rows = [row for row in results if row is not None and not isinstance(row, Exception)]
+    uploaded = [row for row in rows if row[1] is not None]
+
+    if not uploaded and not failures:
+        pytest.skip("⚠️ No report could be scraped and downloaded for the selected companies.")
+
+    assert uploaded, f"❌ Every pipeline run failed: {'; '.join(failures)}"
+
+    # 3️⃣ Write report URLs and MinIO storage paths back in one statement, which also returns what was stored
+    updated = execute_values(cursor, """
+        UPDATE Ginkgo.csr_reports AS r 
+        SET report_url = v.report_url, minio_path = v.minio_path 
+        FROM (VALUES %s) AS v (report_url, minio_path, symbol, report_year) 
+        WHERE r.symbol = v.symbol AND r.report_year = v.report_year 
+        RETURNING r.symbol, r.report_year, r.minio_path;
+    """, rows, fetch=True)
+    db_conn.commit()
+
+    # 4️⃣ Verify that MinIO paths are correctly stored in the database
+    stored = {(symbol, year): minio_path for symbol, year, minio_path in updated}
+    for _, minio_url, symbol, year in uploaded:
+        assert stored.get((symbol, year)) == minio_url, f"❌ Database MinIO path update failed for {symbol} ({year})."
 
-    print("🔍 Running flake8 on minio_client.py...")
-    subprocess.run([python_exec, "-m", "flake8", "modules/csr_scraper/minio_client.py", "--max-line-length=100"], check=True)
+    cursor.close()
 
-    print("🔍 Checking code formatting with black...")
-    subprocess.run([python_exec, "-m", "black", "--check", "modules/csr_scraper/minio_client.py"], check=True)
+    assert not failures, f"❌ Pipeline failed for {len(failures)}/{len(companies)} companies: {'; '.join(failures)}"
 
-    print("🔍 Sorting imports with isort...")
-    subprocess.run([python_exec, "-m", "isort", "--check-only", "modules/csr_scraper/minio_client.py"], check=True)
+    print(f"✅ End-to-end test PASSED for {len(uploaded)}/{len(companies)} companies.")
 
-    print("🔍 Running security scans with Bandit...")
-    subprocess.run([python_exec, "-m", "bandit", "-r", "modules/csr_scraper/minio_client.py"], check=True)
+@pytest.mark.quality
+def test_code_quality(code_quality):
+    """Run linting, formatting, and security scans for minio_client.py only."""
+    minio_client_path = "modules/csr_scraper/minio_client.py"
+    failures = code_quality(minio_client_path)
+    assert not failures, f"❌ Code quality checks failed for {minio_client_path}: {', '.join(failures)}"
 
 if __name__ == "__main__":
-    test_end_to_end()
-    test_code_quality()
+    pytest.main([__file__])
@@ -1,6 +1,5 @@
 import pytest
 import psycopg2
-import subprocess
 import sys
 import os
 from minio import Minio
@@ -9,7 +8,7 @@ from minio import Minio
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../modules")))
 
 from config import DB_CONFIG, MINIO_CONFIG
-from minio_client import get_db_connection, upload_to_minio, update_minio_path, get_pdfs_to_download
+from minio_client import get_db_connection, download_pdf, upload_to_minio, update_minio_path, get_pdfs_to_download
 
 def test_database_connection():
     """Test if the database connection is successful."""
@@ -75,6 +74,48 @@ def test_file_upload():
     os.remove(test_file)
     print("✅ File upload & verification successful.")
 
+def test_download_and_upload_pdf():
+    """Test downloading a real report with `download_pdf()` and uploading it with `upload_to_minio()`."""
+    minio_client = Minio(
+        MINIO_CONFIG["endpoint"],
+        access_key=MINIO_CONFIG["access_key"],
+        secret_key=MINIO_CONFIG["secret_key"],
+        secure=False
+    )
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT report_url FROM ginkgo.csr_reports WHERE report_url IS NOT NULL LIMIT 1;")
+    report = cursor.fetchone()
+    cursor.close()
+    conn.close()
+
+    if not report:
+        pytest.skip("⚠️ No report URLs in the database to download.")
+
+    test_file = f"test_download_{os.environ.get('PYTEST_XDIST_WORKER', 'gw0')}.pdf"
+    bucket_name = MINIO_CONFIG["bucket"]
+    object_name = f"test_folder/{test_file}"
+
+    # Download file
+    if not download_pdf(report[0], test_file):
+        pytest.skip(f"⚠️ Failed to download {report[0]}.")
+
+    try:
+        # Upload file
+        minio_url = upload_to_minio(test_file, bucket_name, object_name)
+        assert minio_url is not None, "❌ upload_to_minio returned no path!"
+
+        # Verify file exists in MinIO
+        found = minio_client.stat_object(bucket_name, object_name)
+        assert found is not None, "❌ Uploaded file not found in MinIO!"
+    finally:
+        # Cleanup
+        minio_client.remove_object(bucket_name, object_name)
+        os.remove(test_file)
+    print(f"✅ PDF download & upload successful: {minio_url}")
+
+@pytest.mark.xdist_group("pg_writer")
 def test_update_minio_path():
     """Test if `update_minio_path()` correctly updates the database."""
     conn = get_db_connection()
@@ -109,28 +150,12 @@ def test_pdfs_to_download():
     assert isinstance(pdfs, list), "❌ Expected list of PDFs, got something else."
     print(f"✅ {len(pdfs)} PDFs found for processing.")
 
-def test_code_quality():
+@pytest.mark.quality
+def test_code_quality(code_quality):
     """Run linting, formatting, and security scans for minio_client.py only."""
-    python_exec = sys.executable  # Get the correct Python path
     minio_client_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../modules/minio_client.py"))
-
-    print("🔍 Running flake8 on minio_client.py...")
-    subprocess.run([python_exec, "-m", "flake8", minio_client_path, "--max-line-length=100"], check=True)
-
-    print("🔍 Checking code formatting with black...")
-    subprocess.run([python_exec, "-m", "black", "--check", minio_client_path], check=True)
-
-    print("🔍 Sorting imports with isort...")
-    subprocess.run([python_exec, "-m", "isort", "--check-only", minio_client_path], check=True)
-
-    print("🔍 Running security scans with Bandit...")
-    subprocess.run([python_exec, "-m", "bandit", "-r", minio_client_path], check=True)
+    failures = code_quality(minio_client_path)
+    assert not failures, f"❌ Code quality checks failed for {minio_client_path}: {', '.join(failures)}"
 
 if __name__ == "__main__":
-    test_database_connection()
-    test_minio_connection()
-    test_minio_bucket()
-    test_file_upload()
-    test_update_minio_path()
-    test_pdfs_to_download()
-    test_code_quality()
+    pytest.main([__file__])
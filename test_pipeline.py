@@ -1,130 +1,100 @@
 import pytest
-import psycopg2
-import random
 import sys
 import os
-import subprocess
-from config import DB_CONFIG
-from scraper import google_search_pdf
-from minio_client import download_pdf, upload_to_minio, update_minio_path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from psycopg2.extras import execute_values
+from download_helpers import download_and_upload
 
 # Add project root to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../modules/csr_scraper")))
 
-def test_scraper_to_database():
+def test_scraper_to_database(prepared_conn, cached_google_search, sample_reports):
     """Test if the scraper correctly finds and stores URLs in the database."""
     
-    conn = psycopg2.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-
-    # Select a random company with no report_url
-    cursor.execute("""
-        SELECT symbol, company_name FROM Ginkgo.csr_reports 
-        WHERE report_url IS NULL 
-        ORDER BY RANDOM() 
-        LIMIT 1;
-    """)
-    company = cursor.fetchone()
+    cursor = prepared_conn.cursor()
+
+    # Select and lock a random report row with no report_url, skipping rows other workers hold
+    companies = sample_reports(cursor, ["symbol", "company_name", "report_year"], "report_url IS NULL", 1)
     
-    if not company:
+    if not companies:
         pytest.skip("⚠️ Skipping: No companies found without report_url.")
 
-    symbol, company_name = company
-    year = random.randint(2014, 2024)  # ✅ 修正年份范围
+    symbol, company_name, year = companies[0]
 
     # Try scraping
-    url = google_search_pdf(company_name, year)
+    url = cached_google_search(company_name, year)
     if url is None:
         pytest.skip(f"⚠️ Scraper did not find a URL for {company_name} ({year})")
 
-    # Update the database
-    cursor.execute("""
-        UPDATE Ginkgo.csr_reports 
-        SET report_url = %s 
-        WHERE symbol = %s AND report_year = %s;
-    """, (url, symbol, year))
-    conn.commit()
-
-    # Verify update
-    cursor.execute("""
-        SELECT report_url FROM Ginkgo.csr_reports 
-        WHERE symbol = %s AND report_year = %s;
-    """, (symbol, year))
+    # Update the database and read back the stored URL in the same statement
+    cursor.execute("EXECUTE upd_report(%s, %s, %s);", (url, symbol, year))
     result = cursor.fetchone()
+    prepared_conn.commit()
     
     assert result is not None and result[0] == url, "❌ Database update failed!"
 
     cursor.close()
-    conn.close()
     print(f"✅ Scraper found & updated {company_name} ({year}) in database.")
 
-def test_minio_storage():
-    """Test if the MinIO storage system correctly handles PDF uploads."""
+def test_minio_storage(db_conn, http_session, sample_reports):
+    """Test if the MinIO storage system correctly handles a batch of PDF uploads."""
     
-    conn = psycopg2.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-
-    # Select a random report that has a URL but no MinIO path
-    cursor.execute("""
-        SELECT symbol, report_year, report_url FROM Ginkgo.csr_reports 
-        WHERE report_url IS NOT NULL AND minio_path IS NULL 
-        ORDER BY RANDOM() 
-        LIMIT 1;
-    """)
-    report = cursor.fetchone()
-
-    if not report:
-        pytest.skip("⚠️ Skipping: No reports found with missing MinIO path.")
-
-    symbol, year, report_url = report
-    year = random.randint(2014, 2024)  # ✅ 修正年份范围
-    pdf_filename = f"{symbol}_{year}.pdf"
-
-    # Download PDF
-    success = download_pdf(report_url, pdf_filename)
-    if not success:
-        pytest.skip(f"⚠️ Failed to download PDF for {symbol} ({year}), skipping upload.")
+    cursor = db_conn.cursor()
 
-    # Upload to MinIO
-    minio_url = upload_to_minio(pdf_filename, "csreport", pdf_filename)
-    assert minio_url is not None, "❌ MinIO upload failed!"
+    # Select and lock up to 16 random reports that have a URL but no MinIO path
+    reports = sample_reports(cursor, ["symbol", "report_year", "report_url"], "report_url IS NOT NULL AND minio_path IS NULL", 16)
 
-    # Update database
-    update_minio_path(symbol, year, minio_url)
-
-    # Verify update
-    cursor.execute("""
-        SELECT minio_path FROM Ginkgo.csr_reports 
-        WHERE symbol = %s AND report_year = %s;
-    """, (symbol, year))
-    result = cursor.fetchone()
-    
-    assert result is not None and result[0] == minio_url, "❌ Database MinIO path update failed!"
+    if not reports:
+        pytest.skip("⚠️ Skipping: No reports found with missing MinIO path.")
 
-    # Cleanup
-    os.remove(pdf_filename)
+    # Download the PDFs and upload them to MinIO, 16 at a time
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        futures = {
+            executor.submit(download_and_upload, http_session, report_url, "csreport", f"{symbol}_{year}.pdf"): (symbol, year)
+            for symbol, year, report_url in reports
+        }
+        # One report's error must not discard the others' uploads; report each failure instead
+        uploaded, failures = [], []
+        for future in as_completed(futures):
+            symbol, year = futures[future]
+            try:
+                minio_url = future.result()
+            except Exception as e:
+                print(f"❌ Upload failed for {symbol} ({year}): {e!r}")
+                failures.append(f"{symbol} ({year}): {e!r}")
+                continue
+            if minio_url is not None:
+                uploaded.append((minio_url, symbol, year))
+
+    if not uploaded and not failures:
+        pytest.skip(f"⚠️ Failed to download any of {len(reports)} PDFs, skipping upload.")
+    assert uploaded, f"❌ Every upload failed: {'; '.join(failures)}"
+
+    # Update the database in one statement and read back the stored paths
+    updated = execute_values(cursor, """
+        UPDATE Ginkgo.csr_reports AS r 
+        SET minio_path = v.minio_path 
+        FROM (VALUES %s) AS v (minio_path, symbol, report_year) 
+        WHERE r.symbol = v.symbol AND r.report_year = v.report_year 
+        RETURNING r.symbol, r.report_year, r.minio_path;
+    """, uploaded, fetch=True)
+    db_conn.commit()
+
+    stored = {(symbol, year): minio_path for symbol, year, minio_path in updated}
+    for minio_url, symbol, year in uploaded:
+        assert stored.get((symbol, year)) == minio_url, f"❌ Database MinIO path update failed for {symbol} ({year})!"
 
     cursor.close()
-    conn.close()
-    print(f"✅ PDF for {symbol} ({year}) uploaded to MinIO & database updated.")
-
-def test_code_quality():
-    """Run linting, formatting, and security scans for pipeline tests only."""
-    python_exec = sys.executable
 
-    print("🔍 Running flake8 on minio_client.py...")
-    subprocess.run([python_exec, "-m", "flake8", "modules/csr_scraper/minio_client.py", "--max-line-length=100"], check=True)
+    assert not failures, f"❌ Upload failed for {len(failures)}/{len(reports)} reports: {'; '.join(failures)}"
+    print(f"✅ {len(uploaded)}/{len(reports)} PDFs uploaded to MinIO & database updated.")
 
-    print("🔍 Checking code formatting with black...")
-    subprocess.run([python_exec, "-m", "black", "--check", "modules/csr_scraper/minio_client.py"], check=True)
-
-    print("🔍 Sorting imports with isort...")
-    subprocess.run([python_exec, "-m", "isort", "--check-only", "modules/csr_scraper/minio_client.py"], check=True)
-
-    print("🔍 Running security scans with Bandit...")
-    subprocess.run([python_exec, "-m", "bandit", "-r", "modules/csr_scraper/minio_client.py"], check=True)
+@pytest.mark.quality
+def test_code_quality(code_quality):
+    """Run linting, formatting, and security scans for pipeline tests only."""
+    minio_client_path = "modules/csr_scraper/minio_client.py"
+    failures = code_quality(minio_client_path)
+    assert not failures, f"❌ Code quality checks failed for {minio_client_path}: {', '.join(failures)}"
 
 if __name__ == "__main__":
-    test_scraper_to_database()
-    test_minio_storage()
-    test_code_quality()
+    pytest.main([__file__])
@@ -1,5 +1,4 @@
 import pytest
-import subprocess
 import sys
 import os
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -40,25 +39,12 @@ def test_scheduler_setup():
     assert job is not None, "❌ Failed to create scheduler job."
     print("✅ Scheduler setup successful.")
 
-def test_code_quality():
+@pytest.mark.quality
+def test_code_quality(code_quality):
     """Run linting, formatting, and security scans for scheduler.py only."""
-    python_exec = sys.executable  # Get the correct Python path
     scheduler_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../modules/scheduler.py"))
-
-    print("🔍 Running flake8 on scheduler.py...")
-    subprocess.run([python_exec, "-m", "flake8", scheduler_path, "--max-line-length=100"], check=True)
-
-    print("🔍 Checking code formatting with black...")
-    subprocess.run([python_exec, "-m", "black", "--check", scheduler_path], check=True)
-
-    print("🔍 Sorting imports with isort...")
-    subprocess.run([python_exec, "-m", "isort", "--check-only", scheduler_path], check=True)
-
-    print("🔍 Running security scans with Bandit...")
-    subprocess.run([python_exec, "-m", "bandit", "-r", scheduler_path], check=True)
+    failures = code_quality(scheduler_path)
+    assert not failures, f"❌ Code quality checks failed for {scheduler_path}: {', '.join(failures)}"
 
 if __name__ == "__main__":
-    test_run_script()
-    test_run_all_scripts()
-    test_scheduler_setup()
-    test_code_quality()
+    pytest.main([__file__])
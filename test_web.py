@@ -1,5 +1,4 @@
 import pytest
-import subprocess
 import sys
 import os
 import requests
@@ -42,9 +41,9 @@ def test_flask_index_page(start_flask_server):
     assert "CSR Report Lookup" in response.text, "❌ Flask page content incorrect!"
     print("✅ Flask index page loaded successfully.")
 
-def test_code_quality():
+@pytest.mark.quality
+def test_code_quality(code_quality):
     """Run linting, formatting, and security scans for api.py, app.py, and main.py."""
-    python_exec = sys.executable  # Get the correct Python path
     files_to_check = [
         "../../modules/web_search/api.py",
         "../../modules/web_search/app.py",
@@ -53,17 +52,8 @@ def test_code_quality():
     for file in files_to_check:
         file_path = os.path.abspath(os.path.join(os.path.dirname(__file__), file))
 
-        print(f"🔍 Running flake8 on {file}...")
-        subprocess.run([python_exec, "-m", "flake8", file_path, "--max-line-length=100"], check=True)
-
-        print(f"🔍 Checking code formatting with black on {file}...")
-        subprocess.run([python_exec, "-m", "black", "--check", file_path], check=True)
-
-        print(f"🔍 Sorting imports with isort on {file}...")
-        subprocess.run([python_exec, "-m", "isort", "--check-only", file_path], check=True)
-
-        print(f"🔍 Running security scans with Bandit on {file}...")
-        subprocess.run([python_exec, "-m", "bandit", "-r", file_path], check=True)
+        failures = code_quality(file_path)
+        assert not failures, f"❌ Code quality checks failed for {file}: {', '.join(failures)}"
 
 if __name__ == "__main__":
     import pytest